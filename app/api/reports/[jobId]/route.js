@@ -37,6 +37,26 @@ export async function GET(request, { params }) {
   try {
     // Fetch PDF from ML backend
     const pdfResponse = await fetch(`${ML_BACKEND_URL}/api/reports/${jobId}/pdf`);
+
+    // PDF is generated after the job completes and may not be ready yet
+    if (pdfResponse.status === 202) {
+      return NextResponse.json(
+        { message: 'Report PDF is still being generated' },
+        {
+          status: 202,
+          headers: { 'Retry-After': pdfResponse.headers.get('Retry-After') || '2' }
+        }
+      );
+    }
+    
+    // PDF generation failed on the ML backend, pass the reason through
+    if (pdfResponse.status === 500) {
+      const data = await pdfResponse.json().catch(() => ({}));
+      return NextResponse.json(
+        { message: data.detail || 'Report PDF generation failed' },
+        { status: 500 }
+      );
+    }
     
     if (!pdfResponse.ok) {
       throw new Error('Failed to fetch PDF from ML backend');
@@ -22,6 +22,22 @@ os.makedirs(REPORTS_DIR, exist_ok=True)
 HOST = os.getenv("HOST", "127.0.0.1")
 PORT = int(os.getenv("PORT", 8000))
 
+# Inference config
+INFERENCE_BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_SIZE", 16))
+# "auto" compiles only on CUDA, where the slow startup compile pays off
+TORCH_COMPILE = os.getenv("TORCH_COMPILE", "auto")
+QUANTIZE_INT8 = os.getenv("QUANTIZE_INT8", "0") == "1"
+
+# Prediction cache (Redis is optional)
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", 1000))
+PREDICTION_CACHE_TTL = int(os.getenv("PREDICTION_CACHE_TTL", 86400))
+REDIS_URL = os.getenv("REDIS_URL")
+# Namespaces cached predictions; defaults to a fingerprint of the checkpoint files
+MODEL_VERSION = os.getenv("MODEL_VERSION")
+
+# PDF report worker processes
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", min(4, os.cpu_count() or 1)))
+
 # Cell type full names for reports
 CELL_TYPE_NAMES = {
     "ABE": "Abnormal Eosinophil",
@@ -48,4 +64,4 @@ CELL_TYPE_NAMES = {
 }
 
 # Malignant cell types (Blast and other abnormal cells)
-MALIGNANT_CLASSES = {"BLA", "MYB", "PLM", "PMO", "ABE", "FGC", "HAC", "LYI"}
+MALIGNANT_CLASSES = frozenset({"BLA", "MYB", "PLM", "PMO", "ABE", "FGC", "HAC", "LYI"})
@@ -1,4 +1,5 @@
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import OperationFailure
 from datetime import datetime
 from bson import ObjectId
 from config import MONGODB_URI
@@ -11,11 +12,27 @@ def get_database():
     """Get or create database connection"""
     global client, db
     if client is None:
-        client = MongoClient(MONGODB_URI)
+        client = AsyncIOMotorClient(MONGODB_URI, maxPoolSize=200, minPoolSize=10, maxIdleTimeMS=300000)
         db = client.get_database()
     return db
 
-def update_job_status(job_id: str, status: str, progress: int, result: dict = None):
+async def init_database():
+    """Connect to MongoDB and make sure the lookup indexes exist"""
+    database = get_database()
+    indexes = [
+        (database.jobs, "jobId"),
+        (database.reports, "jobId"),
+        (database.patients, "patientId"),
+    ]
+    for collection, field in indexes:
+        try:
+            await collection.create_index(field, unique=True)
+        except OperationFailure as e:
+            # e.g. duplicate legacy documents or a conflicting non-unique index
+            print(f"Warning: could not create unique index on {collection.name}.{field}: {e}")
+    return database
+
+async def update_job_status(job_id: str, status: str, progress: int, result: dict = None):
     """Update job status in database"""
     database = get_database()
     update_data = {
@@ -26,12 +43,12 @@ def update_job_status(job_id: str, status: str, progress: int, result: dict = No
     if result:
         update_data["result"] = result
         
-    database.jobs.update_one(
+    await database.jobs.update_one(
         {"jobId": job_id},
         {"$set": update_data}
     )
 
-def create_report(job_id: str, patient_id: str, lab_id: str, classification_result: dict, pdf_path: str, individual_results: list = None):
+async def create_report(job_id: str, patient_id: str, lab_id: str, classification_result: dict, pdf_path: str, individual_results: list = None):
     """Create a new report in database"""
     database = get_database()
     report = {
@@ -52,33 +69,50 @@ def create_report(job_id: str, patient_id: str, lab_id: str, classification_resu
         "pdfUrl": pdf_path,
         "createdAt": datetime.utcnow()
     }
-    database.reports.insert_one(report)
+    await database.reports.insert_one(report)
     return report
 
-def get_report(job_id: str):
+async def set_report_pdf(job_id: str, pdf_path: str = None, error: str = None):
+    """Attach a generated PDF to an existing report, or record why generation failed"""
+    database = get_database()
+    update_data = {"pdfUrl": pdf_path}
+    if error:
+        update_data["pdfError"] = error
+    await database.reports.update_one(
+        {"jobId": job_id},
+        {"$set": update_data}
+    )
+
+async def get_reports_without_pdf():
+    """Get reports whose PDF was never generated and did not fail"""
+    database = get_database()
+    cursor = database.reports.find({"pdfUrl": None, "pdfError": {"$exists": False}})
+    return await cursor.to_list(length=None)
+
+async def get_report(job_id: str):
     """Get report by job ID"""
     database = get_database()
-    report = database.reports.find_one({"jobId": job_id})
+    report = await database.reports.find_one({"jobId": job_id})
     if report:
         report["_id"] = str(report["_id"])
         if report.get("labId"):
             report["labId"] = str(report["labId"])
     return report
 
-def get_job(job_id: str):
+async def get_job(job_id: str):
     """Get job by job ID"""
     database = get_database()
-    job = database.jobs.find_one({"jobId": job_id})
+    job = await database.jobs.find_one({"jobId": job_id})
     if job:
         job["_id"] = str(job["_id"])
         if job.get("labId"):
             job["labId"] = str(job["labId"])
     return job
 
-def get_patient(patient_id: str):
+async def get_patient(patient_id: str):
     """Get patient by patient ID"""
     database = get_database()
-    patient = database.patients.find_one({"patientId": patient_id})
+    patient = await database.patients.find_one({"patientId": patient_id})
     if patient:
         patient["_id"] = str(patient["_id"])
     return patient
@@ -1,25 +1,38 @@
 import os
 import uuid
+import shutil
 import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from datetime import datetime
 from typing import Optional, List
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, BackgroundTasks
+from fastapi import FastAPI, File, UploadFile, Form, Header, HTTPException, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
-import aiofiles
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse
+import numpy as np
 
-from config import UPLOAD_DIR, REPORTS_DIR, HOST, PORT
+from config import UPLOAD_DIR, REPORTS_DIR, HOST, PORT, INFERENCE_BATCH_SIZE, REPORT_WORKERS, CELL_TYPE_NAMES, MALIGNANT_CLASSES
 from model_loader import get_classifier
-from database import update_job_status, create_report, get_report, get_job, get_patient
-from report_generator import generate_pdf_report
+from database import init_database, update_job_status, create_report, set_report_pdf, get_reports_without_pdf, get_report, get_job, get_patient
+from report_generator import generate_pdf_report_async
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Cytomind ML Backend",
     description="Bone Marrow Cell Classification API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
+# Model inference runs on a single dedicated thread so it never blocks the
+# event loop and GPU work stays serialized
+INFER_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+
+# PDF reports are generated by a background worker after the job completes
+PDF_QUEUE: asyncio.Queue = asyncio.Queue()
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -29,13 +42,66 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize classifier on startup
+# Initialize database and classifier on startup
 @app.on_event("startup")
 async def startup_event():
-    """Load the ML model on startup"""
+    """Connect to the database and load the ML model on startup"""
+    print("Connecting to database...")
+    await init_database()
     print("Initializing ML model...")
-    get_classifier()
+    get_classifier().warmup()
     print("ML model ready!")
+    app.state.pdf_workers = [asyncio.create_task(pdf_worker()) for _ in range(REPORT_WORKERS)]
+    
+    # The PDF queue lives in memory, so pick up reports left behind by a restart
+    pending = await get_reports_without_pdf()
+    for report in pending:
+        await PDF_QUEUE.put(await pdf_task_from_report(report))
+    if pending:
+        print(f"Re-queued {len(pending)} report PDF(s) left pending")
+
+async def pdf_task_from_report(report: dict) -> dict:
+    """Rebuild a PDF queue task from a stored report"""
+    patient = await get_patient(report["patientId"]) or {}
+    return {
+        "job_id": report["jobId"],
+        "patient_data": {
+            "patientId": report["patientId"],
+            "name": patient.get("name", "N/A"),
+            "age": patient.get("age", "N/A")
+        },
+        "classification_result": {
+            "classification": report["classification"],
+            "primary_class": report["primaryClass"],
+            "primary_class_full_name": report.get("primaryClassFullName", report["primaryClass"]),
+            "malignancy_percentage": report["malignancyPercentage"],
+            "malignant_cell_count": report.get("malignantCellCount", 0),
+            "confidence": report["confidence"],
+            "top_predictions": report.get("topPredictions", []),
+            "cell_distribution": report.get("cellDistribution", {}),
+            "total_cells": report.get("totalCellsAnalyzed", 1)
+        },
+        "image_paths": None,
+        "individual_results": report.get("individualResults", [])
+    }
+
+async def pdf_worker():
+    """Generate queued PDF reports in the report process pool and attach them to their reports"""
+    while True:
+        task = await PDF_QUEUE.get()
+        try:
+            pdf_path = await asyncio.wrap_future(generate_pdf_report_async(**task))
+            await set_report_pdf(task["job_id"], pdf_path)
+        except Exception as e:
+            print(f"Error generating PDF for job {task['job_id']}: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            try:
+                await set_report_pdf(task["job_id"], error=str(e) or type(e).__name__)
+            except Exception as db_error:
+                print(f"Error recording PDF failure for job {task['job_id']}: {str(db_error)}")
+        finally:
+            PDF_QUEUE.task_done()
 
 @app.get("/")
 async def root():
@@ -67,58 +133,40 @@ async def process_image_task(
         total_images = len(image_paths)
         
         # Update status: Processing started
-        update_job_status(job_id, "PROCESSING", 5)
-        await asyncio.sleep(0.3)
+        await update_job_status(job_id, "PROCESSING", 5)
         
         classifier = get_classifier()
+        loop = asyncio.get_running_loop()
         all_results = []
         
-        # Process each image
-        for idx, image_path in enumerate(image_paths):
-            progress = 10 + int((idx / total_images) * 60)
-            update_job_status(job_id, "PROCESSING", progress)
-            
-            result = classifier.predict(image_path)
-            result['image_index'] = idx + 1
-            result['image_filename'] = os.path.basename(image_path)
-            all_results.append(result)
-            
-            await asyncio.sleep(0.1)
+        # Only write progress to the database when it crosses a 5% step
+        last_reported = -1
+        
+        # Process images in batches
+        for start in range(0, total_images, INFERENCE_BATCH_SIZE):
+            progress = 10 + int((start / total_images) * 60)
+            if progress // 5 != last_reported // 5:
+                await update_job_status(job_id, "PROCESSING", progress)
+                last_reported = progress
+
+            batch_paths = image_paths[start:start + INFERENCE_BATCH_SIZE]
+            batch_results = await loop.run_in_executor(INFER_EXECUTOR, classifier.predict_many, batch_paths)
+            for idx, (image_path, result) in enumerate(zip(batch_paths, batch_results), start):
+                result['image_index'] = idx + 1
+                result['image_filename'] = os.path.basename(image_path)
+                all_results.append(result)
         
         # Aggregate results from all images
-        update_job_status(job_id, "PROCESSING", 75)
+        await update_job_status(job_id, "PROCESSING", 75)
         aggregated = aggregate_results(all_results)
         
-        # Update status: Generating report
-        update_job_status(job_id, "PROCESSING", 85)
-        await asyncio.sleep(0.2)
-        
-        # Generate PDF report
-        patient_data = {
-            "patientId": patient_id,
-            "name": patient_name,
-            "age": patient_age
-        }
-        
-        pdf_path = generate_pdf_report(
-            job_id=job_id,
-            patient_data=patient_data,
-            classification_result=aggregated,
-            image_paths=image_paths,
-            individual_results=all_results
-        )
-        
-        # Update status: Report generation complete
-        update_job_status(job_id, "PROCESSING", 95)
-        await asyncio.sleep(0.2)
-        
-        # Create report in database
-        report = create_report(
+        # Create report in database; the PDF is attached once it has been generated
+        report = await create_report(
             job_id=job_id,
             patient_id=patient_id,
             lab_id=lab_id,
             classification_result=aggregated,
-            pdf_path=pdf_path,
+            pdf_path=None,
             individual_results=all_results
         )
         
@@ -132,10 +180,26 @@ async def process_image_task(
             "topPredictions": aggregated["top_predictions"],
             "totalCellsAnalyzed": total_images,
             "cellDistribution": aggregated["cell_distribution"],
-            "individualResults": all_results
+            "individualResults": all_results,
+            "patientId": patient_id,
+            "date": report["createdAt"]
         }
         
-        update_job_status(job_id, "COMPLETED", 100, result_data)
+        await update_job_status(job_id, "COMPLETED", 100, result_data)
+        
+        # Generate the PDF off the critical path
+        patient_data = {
+            "patientId": patient_id,
+            "name": patient_name,
+            "age": patient_age
+        }
+        await PDF_QUEUE.put({
+            "job_id": job_id,
+            "patient_data": patient_data,
+            "classification_result": aggregated,
+            "image_paths": image_paths,
+            "individual_results": all_results
+        })
         
         print(f"Job {job_id} completed successfully! ({total_images} images processed)")
         
@@ -143,7 +207,13 @@ async def process_image_task(
         print(f"Error processing job {job_id}: {str(e)}")
         import traceback
         traceback.print_exc()
-        update_job_status(job_id, "FAILED", 0, {"error": str(e)})
+        await update_job_status(job_id, "FAILED", 0, {"error": str(e)})
+
+
+def save_upload(upload: UploadFile, path: str):
+    """Stream an uploaded file to disk in 1 MiB chunks instead of reading it into memory"""
+    with open(path, 'wb') as f:
+        shutil.copyfileobj(upload.file, f, 1024 * 1024)
 
 
 def aggregate_results(all_results: List[dict]) -> dict:
@@ -159,49 +229,13 @@ def aggregate_results(all_results: List[dict]) -> dict:
         return result
     
     # Count cell types
-    cell_counts = {}
-    malignant_count = 0
-    
-    # Define malignant cell types
-    malignant_classes = ['BLA', 'MYB', 'PMO', 'FGC', 'ABE', 'EBO', 'PLM']
-    
-    # Cell type full names
-    cell_names = {
-        'ABE': 'Abnormal Eosinophil',
-        'ART': 'Artefact',
-        'BAS': 'Basophil',
-        'BLA': 'Blast Cell',
-        'EBO': 'Erythroblast',
-        'EOS': 'Eosinophil',
-        'FGC': 'Faggot Cell',
-        'HAC': 'Hairy Cell',
-        'KSC': 'Kidney Shaped Cell',
-        'LYI': 'Lymphocyte Immature',
-        'LYT': 'Lymphocyte',
-        'MMZ': 'Metamyelocyte',
-        'MON': 'Monocyte',
-        'MYB': 'Myeloblast',
-        'NGB': 'Band Neutrophil',
-        'NGS': 'Segmented Neutrophil',
-        'NIF': 'Neutrophil Immature',
-        'OTH': 'Other',
-        'PEB': 'Proerythroblast',
-        'PLM': 'Plasma Cell',
-        'PMO': 'Promyelocyte'
-    }
-    
-    for result in all_results:
-        cell_type = result.get('primary_class', 'OTH')
-        cell_counts[cell_type] = cell_counts.get(cell_type, 0) + 1
-        
-        if cell_type in malignant_classes:
-            malignant_count += 1
-    
+    cell_counts = Counter(r.get('primary_class', 'OTH') for r in all_results)
+    malignant_count = sum(cell_counts[cell_type] for cell_type in MALIGNANT_CLASSES)
     total_cells = len(all_results)
     
-    # Find most common cell type
-    primary_class = max(cell_counts, key=cell_counts.get)
-    primary_count = cell_counts[primary_class]
+    # Cell types ordered by count; the first is the most common
+    ranked = cell_counts.most_common()
+    primary_class = ranked[0][0]
     
     # Calculate malignancy percentage
     malignancy_percentage = round((malignant_count / total_cells) * 100, 1)
@@ -215,31 +249,35 @@ def aggregate_results(all_results: List[dict]) -> dict:
         classification = "BENIGN"
     
     # Calculate average confidence across all results
-    avg_confidence = sum(r.get('confidence', 0) for r in all_results) / total_cells
+    avg_confidence = float(np.mean([r.get('confidence', 0) for r in all_results]))
     
     # Create cell distribution with percentages
-    cell_distribution = {}
-    for cell_type, count in sorted(cell_counts.items(), key=lambda x: x[1], reverse=True):
-        cell_distribution[cell_type] = {
-            'count': count,
-            'percentage': round((count / total_cells) * 100, 1),
-            'full_name': cell_names.get(cell_type, cell_type)
+    counts = np.fromiter((count for _, count in ranked), dtype=np.int64, count=len(ranked))
+    percentages = np.round(counts * (100.0 / total_cells), 1)
+    cell_distribution = {
+        cell_type: {
+            'count': int(count),
+            'percentage': float(percentage),
+            'full_name': CELL_TYPE_NAMES.get(cell_type, cell_type)
         }
+        for (cell_type, count), percentage in zip(ranked, percentages)
+    }
     
     # Create top predictions based on cell distribution
-    top_predictions = []
-    for cell_type, data in list(cell_distribution.items())[:5]:
-        top_predictions.append({
+    top_predictions = [
+        {
             'class': cell_type,
-            'full_name': data['full_name'],
-            'probability': data['percentage'],
-            'count': data['count']
-        })
+            'full_name': cell_distribution[cell_type]['full_name'],
+            'probability': cell_distribution[cell_type]['percentage'],
+            'count': count
+        }
+        for cell_type, count in ranked[:5]
+    ]
     
     return {
         "classification": classification,
         "primary_class": primary_class,
-        "primary_class_full_name": cell_names.get(primary_class, primary_class),
+        "primary_class_full_name": CELL_TYPE_NAMES.get(primary_class, primary_class),
         "malignancy_percentage": malignancy_percentage,
         "malignant_cell_count": malignant_count,
         "confidence": round(avg_confidence, 1),
@@ -268,25 +306,24 @@ async def analyze_image(
     # Validate file types
     allowed_types = ["image/jpeg", "image/jpg", "image/png", "image/tiff"]
     
-    image_paths = []
-    
-    for idx, image in enumerate(images):
+    for image in images:
         if image.content_type not in allowed_types:
             raise HTTPException(
                 status_code=400,
                 detail=f"Invalid file type for {image.filename}. Allowed types: {', '.join(allowed_types)}"
             )
-        
-        # Save uploaded image
+    
+    async def _save(idx: int, image: UploadFile) -> str:
+        """Save one uploaded image and return its path"""
         file_extension = os.path.splitext(image.filename)[1] or ".jpg"
         saved_filename = f"{job_id}_{idx}{file_extension}"
         image_path = os.path.join(UPLOAD_DIR, saved_filename)
         
-        async with aiofiles.open(image_path, 'wb') as f:
-            content = await image.read()
-            await f.write(content)
-        
-        image_paths.append(image_path)
+        await run_in_threadpool(save_upload, image, image_path)
+        return image_path
+    
+    # Save all uploaded images concurrently
+    image_paths = list(await asyncio.gather(*[_save(idx, image) for idx, image in enumerate(images)]))
     
     # Start background processing
     background_tasks.add_task(
@@ -310,7 +347,7 @@ async def analyze_image(
 @app.get("/api/jobs/{job_id}/status")
 async def get_job_status(job_id: str):
     """Get the status of a processing job"""
-    job = get_job(job_id)
+    job = await get_job(job_id)
     
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -324,12 +361,6 @@ async def get_job_status(job_id: str):
     # Include result if completed
     if job["status"] == "COMPLETED" and job.get("result"):
         response["report"] = job["result"]
-        
-        # Get full report from database
-        report = get_report(job_id)
-        if report:
-            response["report"]["patientId"] = report.get("patientId")
-            response["report"]["date"] = report.get("createdAt")
     
     if job["status"] == "FAILED" and job.get("result"):
         response["message"] = job["result"].get("error", "Processing failed")
@@ -340,7 +371,7 @@ async def get_job_status(job_id: str):
 @app.get("/api/reports/{job_id}")
 async def get_report_details(job_id: str):
     """Get the full report for a job"""
-    report = get_report(job_id)
+    report = await get_report(job_id)
     
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
@@ -354,6 +385,18 @@ async def get_report_details(job_id: str):
 @app.get("/api/reports/{job_id}/pdf")
 async def download_report_pdf(job_id: str):
     """Download the PDF report for a job"""
+    report = await get_report(job_id)
+    if report and report.get("pdfError"):
+        raise HTTPException(status_code=500, detail=f"Report PDF generation failed: {report['pdfError']}")
+    
+    if report and not report.get("pdfUrl"):
+        # Job finished but the PDF worker hasn't caught up yet
+        return ORJSONResponse(
+            status_code=202,
+            content={"status": "PENDING", "message": "Report PDF is still being generated"},
+            headers={"Retry-After": "2"}
+        )
+    
     pdf_path = os.path.join(REPORTS_DIR, f"report_{job_id}.pdf")
     
     if not os.path.exists(pdf_path):
@@ -367,10 +410,15 @@ async def download_report_pdf(job_id: str):
 
 
 @app.post("/api/predict")
-async def predict_single(image: UploadFile = File(...)):
+async def predict_single(
+    image: UploadFile = File(...),
+    cache_control: Optional[str] = Header(None)
+):
     """
     Quick prediction endpoint for a single image
     Returns classification result without storing in database
+    
+    Send `Cache-Control: no-cache` to bypass the prediction cache.
     """
     # Validate file type
     allowed_types = ["image/jpeg", "image/jpg", "image/png", "image/tiff"]
@@ -386,13 +434,14 @@ async def predict_single(image: UploadFile = File(...)):
     temp_path = os.path.join(UPLOAD_DIR, f"temp_{temp_id}{file_extension}")
     
     try:
-        async with aiofiles.open(temp_path, 'wb') as f:
-            content = await image.read()
-            await f.write(content)
+        await run_in_threadpool(save_upload, image, temp_path)
         
         # Run prediction
         classifier = get_classifier()
-        result = classifier.predict(temp_path)
+        use_cache = "no-cache" not in (cache_control or "").lower()
+        result = await asyncio.get_running_loop().run_in_executor(
+            INFER_EXECUTOR, partial(classifier.predict, temp_path, use_cache=use_cache)
+        )
         
         return {
             "success": True,
@@ -1,10 +1,16 @@
+import os
+import copy
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import torch
 import torch.nn as nn
 from torchvision import models, transforms
+from torchvision.io import read_file, decode_image, ImageReadMode
 from PIL import Image
 import numpy as np
-from config import MODEL_PATH, METADATA_PATH, CELL_TYPE_NAMES, MALIGNANT_CLASSES
+from prediction_cache import PredictionCache, hash_file, model_fingerprint
+from config import MODEL_PATH, METADATA_PATH, CELL_TYPE_NAMES, MALIGNANT_CLASSES, INFERENCE_BATCH_SIZE, TORCH_COMPILE, QUANTIZE_INT8, MODEL_VERSION
 
 # Try to import transformers for ViT, fall back if not available
 try:
@@ -81,10 +87,19 @@ class CellClassifier:
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.model = None
         self.metadata = None
-        self.transform = None
+        self.mean = None
+        self.std = None
+        # Cached results are tied to the weights that produced them; quantized
+        # weights give slightly different outputs, so they get their own namespace
+        model_version = MODEL_VERSION or model_fingerprint(MODEL_PATH, METADATA_PATH)
+        if QUANTIZE_INT8 and self.device.type == "cpu":
+            model_version += "-int8"
+        self.cache = PredictionCache(model_version)
+        self._preprocess_pool = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="preprocess")
         self._load_metadata()
         self._load_model()
         self._setup_transforms()
+        self._setup_buffers()
         
     def _load_metadata(self):
         """Load model metadata"""
@@ -94,6 +109,11 @@ class CellClassifier:
         self.num_classes = self.metadata['num_classes']
         self.input_size = self.metadata['input_size']
         
+        # Lookup tables indexed by class position, built once
+        self.classes_arr = np.array(self.classes)
+        self.full_names_arr = np.array([CELL_TYPE_NAMES.get(c, c) for c in self.classes])
+        self.malignant_mask = np.array([c in MALIGNANT_CLASSES for c in self.classes], dtype=bool)
+        
     def _load_model(self):
         """Load the trained model"""
         print(f"Loading model from {MODEL_PATH}...")
@@ -120,75 +140,246 @@ class CellClassifier:
             
         self.model.to(self.device)
         self.model.eval()
+        
+        # Dynamic int8 quantization of the Linear layers (the bulk of the ViT
+        # branch) for CPU deployments
+        if QUANTIZE_INT8 and self.device.type == "cpu":
+            self.model = torch.ao.quantization.quantize_dynamic(self.model, {nn.Linear}, dtype=torch.qint8)
+            print("Model quantized to int8")
+        
+        self.model = self.model.to(memory_format=torch.channels_last)
+        # FP16 autocast only pays off on CUDA tensor cores
+        self.use_amp = self.device.type == "cuda"
+        
+        # Compile once to fuse pointwise ops; compilation itself is lazy and
+        # happens on the first forward pass (see warmup)
+        self.compiled = False
+        use_compile = TORCH_COMPILE == "1" or (TORCH_COMPILE == "auto" and self.device.type == "cuda")
+        if use_compile and hasattr(torch, "compile"):
+            self._eager_model = self.model
+            self.model = torch.compile(self.model, mode="reduce-overhead", fullgraph=False)
+            self.compiled = True
         print("Model loaded successfully!")
         
     def _setup_transforms(self):
-        """Setup image transforms"""
-        self.transform = transforms.Compose([
-            transforms.Resize((self.input_size, self.input_size)),
-            transforms.ToTensor(),
-            transforms.Normalize(
-                mean=[0.485, 0.456, 0.406],
-                std=[0.229, 0.224, 0.225]
-            )
-        ])
+        """Setup normalization constants, applied on the device to uint8 batches"""
+        self.mean = torch.tensor([0.485, 0.456, 0.406], device=self.device).view(1, 3, 1, 1) * 255
+        self.std = torch.tensor([0.229, 0.224, 0.225], device=self.device).view(1, 3, 1, 1) * 255
         
-    def predict(self, image_path: str) -> dict:
-        """
-        Predict cell type from image
+    def _setup_buffers(self):
+        """Preallocate the host staging and device input buffers reused by every batch"""
+        shape = (INFERENCE_BATCH_SIZE, 3, self.input_size, self.input_size)
+        if self.device.type == "cuda":
+            self._staging = torch.empty(shape, dtype=torch.uint8, pin_memory=True)
+            self._device_buf = torch.empty(shape, dtype=torch.uint8, device=self.device)
+        else:
+            # Host and device are the same, no copy needed
+            self._staging = torch.empty(shape, dtype=torch.uint8)
+            self._device_buf = self._staging
+        self._input_buf = torch.empty(shape, device=self.device).contiguous(memory_format=torch.channels_last)
+        # The buffers make inference non-reentrant
+        self._lock = threading.Lock()
+        # Captured in warmup() on CUDA; replays always run on the full buffer
+        self._graph = None
+        self._graph_out = None
         
-        Args:
-            image_path: Path to the image file
+    def warmup(self):
+        """Run dummy forward passes so compilation doesn't hit the first request"""
+        for batch_size in (1, INFERENCE_BATCH_SIZE):
+            dummy = torch.zeros(
+                batch_size, 3, self.input_size, self.input_size, device=self.device
+            ).contiguous(memory_format=torch.channels_last)
+            self._forward(dummy)
+        
+        # torch.compile's reduce-overhead mode already records CUDA graphs
+        if self.device.type == "cuda" and not self.compiled:
+            try:
+                self._capture_graph()
+            except Exception as e:
+                print(f"CUDA graph capture failed, using eager inference: {e}")
+                self._graph = None
+        
+    def _capture_graph(self):
+        """Record the full-batch forward pass over the persistent input buffer as a CUDA graph"""
+        with self._lock:
+            self._input_buf.zero_()
             
-        Returns:
-            Dictionary with prediction results
-        """
-        # Load and preprocess image
-        image = Image.open(image_path).convert('RGB')
-        input_tensor = self.transform(image).unsqueeze(0).to(self.device)
-        
-        # Get prediction
-        with torch.no_grad():
-            outputs = self.model(input_tensor)
-            probabilities = torch.softmax(outputs, dim=1)[0]
+            # Warm up on a side stream before capturing, as required by CUDA graphs
+            stream = torch.cuda.Stream()
+            stream.wait_stream(torch.cuda.current_stream())
+            with torch.cuda.stream(stream):
+                for _ in range(3):
+                    self._forward(self._input_buf)
+            torch.cuda.current_stream().wait_stream(stream)
             
-        # Get top predictions
-        top_probs, top_indices = torch.topk(probabilities, k=5)
-        
-        predictions = []
-        for prob, idx in zip(top_probs.cpu().numpy(), top_indices.cpu().numpy()):
-            class_name = self.classes[idx]
-            predictions.append({
-                "class": class_name,
-                "class_full_name": CELL_TYPE_NAMES.get(class_name, class_name),
+            graph = torch.cuda.CUDAGraph()
+            with torch.cuda.graph(graph):
+                self._graph_out = self._forward(self._input_buf)
+            self._graph = graph
+        
+    def _preprocess(self, image_path: str) -> torch.Tensor:
+        """Decode an image from disk and resize it to a uint8 (3, H, W) tensor"""
+        try:
+            image = decode_image(read_file(image_path), mode=ImageReadMode.RGB)
+        except RuntimeError:
+            # Formats torchvision cannot decode natively (e.g. TIFF)
+            image = transforms.functional.pil_to_tensor(Image.open(image_path).convert('RGB'))
+        return transforms.functional.resize(image, [self.input_size, self.input_size], antialias=True)
+        
+    def _normalize(self, batch: torch.Tensor, out: torch.Tensor) -> torch.Tensor:
+        """Convert a uint8 batch already on the device into normalized float input, written to `out`"""
+        out.copy_(batch)
+        return out.sub_(self.mean).div_(self.std)
+        
+    def _forward(self, batch: torch.Tensor) -> torch.Tensor:
+        """Run the ensemble on a preprocessed batch and return fp32 class probabilities"""
+        with torch.inference_mode():
+            # The autocast weight cache must be off for CUDA graph capture
+            with torch.autocast(device_type=self.device.type, dtype=torch.float16, enabled=self.use_amp, cache_enabled=False):
+                try:
+                    outputs = self.model(batch)
+                except Exception as e:
+                    # Recompiles for new shapes can fail at any time, not just in warmup
+                    if not self.compiled:
+                        raise
+                    print(f"torch.compile failed, falling back to eager mode: {e}")
+                    self.model = self._eager_model
+                    self.compiled = False
+                    outputs = self.model(batch)
+            # Softmax back in fp32 for numerical stability
+            return torch.softmax(outputs.float(), dim=1)
+        
+    def _format_prediction(self, probs: np.ndarray, top_indices: np.ndarray) -> dict:
+        """Build the result dictionary for a single image from its host-side class probabilities"""
+        predictions = [
+            {
+                "class": str(class_name),
+                "class_full_name": str(full_name),
                 "probability": float(prob * 100)
-            })
+            }
+            for class_name, full_name, prob in zip(
+                self.classes_arr[top_indices], self.full_names_arr[top_indices], probs[top_indices]
+            )
+        ]
         
         # Primary prediction
         primary_class = predictions[0]["class"]
         primary_confidence = predictions[0]["probability"]
         
         # Calculate malignancy percentage
-        malignancy_percentage = sum(
-            float(probabilities[self.classes.index(cls)].cpu().numpy() * 100)
-            for cls in MALIGNANT_CLASSES if cls in self.classes
-        )
+        malignancy_percentage = float(probs[self.malignant_mask].sum()) * 100
         
         # Determine if malignant (if primary class is malignant or high malignancy percentage)
-        is_malignant = primary_class in MALIGNANT_CLASSES or malignancy_percentage > 30
+        is_malignant = bool(self.malignant_mask[top_indices[0]]) or malignancy_percentage > 30
         
         return {
             "primary_class": primary_class,
-            "primary_class_full_name": CELL_TYPE_NAMES.get(primary_class, primary_class),
+            "primary_class_full_name": predictions[0]["class_full_name"],
             "confidence": round(primary_confidence, 2),
             "top_predictions": predictions,
             "malignancy_percentage": round(malignancy_percentage, 2),
             "classification": "MALIGNANT" if is_malignant else "BENIGN",
             "all_probabilities": {
-                self.classes[i]: round(float(probabilities[i].cpu().numpy() * 100), 2)
-                for i in range(len(self.classes))
+                cls: round(float(prob * 100), 2)
+                for cls, prob in zip(self.classes, probs)
             }
         }
+        
+    def predict(self, image_path: str, use_cache: bool = True) -> dict:
+        """
+        Predict cell type from image
+        
+        Args:
+            image_path: Path to the image file
+            use_cache: Reuse results for previously seen image content
+            
+        Returns:
+            Dictionary with prediction results
+        """
+        return self.predict_many([image_path], use_cache=use_cache)[0]
+    
+    def predict_many(self, image_paths: list, batch_size: int = INFERENCE_BATCH_SIZE, use_cache: bool = True) -> list:
+        """
+        Predict cell types for multiple images with batched forward passes
+        
+        Images whose content was already classified are served from the
+        prediction cache; the rest are decoded in a thread pool, stacked into
+        batches of at most `batch_size` and run through the model in a single
+        forward pass each.
+        
+        Args:
+            image_paths: List of paths to image files
+            batch_size: Maximum number of images per forward pass
+            use_cache: Reuse results for previously seen image content
+            
+        Returns:
+            List of prediction results, in the same order as image_paths
+        """
+        if not use_cache:
+            return self._run_model(image_paths, batch_size)
+        
+        keys = [hash_file(path) for path in image_paths]
+        results = self.cache.get_many(keys)
+        
+        # Run the model once per distinct uncached image
+        pending = {}
+        for path, key in zip(image_paths, keys):
+            if key not in results:
+                pending.setdefault(key, path)
+        if pending:
+            fresh = self._run_model(list(pending.values()), batch_size)
+            for key, result in zip(pending, fresh):
+                self.cache.set(key, result)
+                results[key] = result
+        
+        # Duplicate images in one request must not share a result object
+        ordered = []
+        seen = set()
+        for key in keys:
+            ordered.append(copy.deepcopy(results[key]) if key in seen else results[key])
+            seen.add(key)
+        return ordered
+    
+    def _run_model(self, image_paths: list, batch_size: int) -> list:
+        """Run the model on all images, batch by batch"""
+        batch_size = min(batch_size, INFERENCE_BATCH_SIZE)
+        chunks = [image_paths[start:start + batch_size] for start in range(0, len(image_paths), batch_size)]
+        results = []
+        if not chunks:
+            return results
+        
+        with self._lock:
+            pending = [self._preprocess_pool.submit(self._preprocess, path) for path in chunks[0]]
+            for n, chunk in enumerate(chunks):
+                tensors = [future.result() for future in pending]
+                
+                # Decode the next batch on the CPU while the device works on this one
+                if n + 1 < len(chunks):
+                    pending = [self._preprocess_pool.submit(self._preprocess, path) for path in chunks[n + 1]]
+                
+                # Copy uint8 pixels (4x fewer bytes than float) through the pinned
+                # staging buffer and normalize on the device
+                size = len(chunk)
+                torch.stack(tensors, out=self._staging[:size])
+                if self._device_buf is not self._staging:
+                    self._device_buf[:size].copy_(self._staging[:size], non_blocking=True)
+                batch = self._normalize(self._device_buf[:size], self._input_buf[:size])
+                
+                # Get predictions for the whole batch; padded rows of the graph
+                # input hold stale data and their outputs are ignored
+                if self._graph is not None:
+                    self._graph.replay()
+                    probabilities = self._graph_out[:size]
+                else:
+                    probabilities = self._forward(batch)
+                _, top_indices = torch.topk(probabilities, k=5, dim=1)
+                
+                # Single device -> host transfer for the whole batch
+                probs_cpu = probabilities.cpu().numpy()
+                top_indices_cpu = top_indices.cpu().numpy()
+                for i in range(size):
+                    results.append(self._format_prediction(probs_cpu[i], top_indices_cpu[i]))
+        return results
     
     def predict_batch(self, image_paths: list) -> list:
         """
@@ -0,0 +1,98 @@
+import copy
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from threading import Lock
+from config import PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL, REDIS_URL
+
+# Redis is optional, the in-process cache works on its own
+try:
+    import redis
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+
+KEY_PREFIX = "cytomind:prediction:"
+
+
+def hash_file(path: str) -> str:
+    """Content hash of an image file, used as the cache key"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def model_fingerprint(*paths: str) -> str:
+    """Short hash of the given model files' paths, sizes and modification times"""
+    digest = hashlib.blake2b(digest_size=8)
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """Two-stage prediction cache: bounded in-process LRU backed by an optional Redis"""
+
+    def __init__(self, model_version: str, max_size: int = PREDICTION_CACHE_SIZE, redis_url: str = REDIS_URL, ttl: int = PREDICTION_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        # Results from a different model must never be served, so keys are per model
+        self.key_prefix = f"{KEY_PREFIX}{model_version}:"
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.redis = None
+        if redis_url:
+            if HAS_REDIS:
+                self.redis = redis.Redis.from_url(redis_url)
+            else:
+                print("Warning: REDIS_URL is set but the redis library is not installed. Using in-process cache only.")
+
+    def _remember(self, key: str, result: dict):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_many(self, keys: list) -> dict:
+        """
+        Look up cached results
+
+        Returns:
+            Dictionary mapping each cached key to a copy of its result
+        """
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[key] = self._entries[key]
+
+        missing = [key for key in keys if key not in found]
+        if missing and self.redis is not None:
+            try:
+                values = self.redis.mget([self.key_prefix + key for key in missing])
+            except redis.RedisError as e:
+                print(f"Warning: Redis cache lookup failed: {e}")
+                values = []
+            for key, value in zip(missing, values):
+                if value is not None:
+                    found[key] = json.loads(value)
+                    self._remember(key, found[key])
+
+        # Callers annotate results in place, never hand out the cached objects
+        return {key: copy.deepcopy(result) for key, result in found.items()}
+
+    def set(self, key: str, result: dict):
+        """Store a prediction result"""
+        result = copy.deepcopy(result)
+        self._remember(key, result)
+        if self.redis is not None:
+            try:
+                self.redis.setex(self.key_prefix + key, self.ttl, json.dumps(result))
+            except redis.RedisError as e:
+                print(f"Warning: Redis cache write failed: {e}")
@@ -1,5 +1,11 @@
 import os
+import time
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+import numpy as np
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -7,7 +13,7 @@ from reportlab.lib.units import inch, cm
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak, HRFlowable
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
 from reportlab.graphics.shapes import Drawing, Rect, String
-from config import REPORTS_DIR
+from config import REPORTS_DIR, MALIGNANT_CLASSES, REPORT_WORKERS
 
 # Color palette
 COLORS = {
@@ -46,10 +52,246 @@ CELL_INFO = {
     'PMO': {'name': 'Promyelocyte', 'category': 'Granulocyte Precursor', 'significance': 'Early myeloid cell; abnormal promyelocytes in APL'}
 }
 
-MALIGNANT_CLASSES = ['BLA', 'MYB', 'PMO', 'FGC', 'ABE', 'EBO', 'PLM', 'HAC']
+# Bound formatters for values repeated on every table row
+_PCT = "{:.1f}%".format
+_LABEL = "{} ({})".format
 
 
-def generate_pdf_report(
+def _distribution_cells(cell_code: str, cell_info: dict) -> tuple:
+    """Static distribution table cells for a cell type: (label, category, significance, is_malignant)"""
+    is_malignant = cell_code in MALIGNANT_CLASSES
+    significance = cell_info['significance']
+    if len(significance) > 50:
+        significance = significance[:50] + "..."
+    label = _LABEL(cell_info['name'], cell_code) + (" !" if is_malignant else "")
+    return label, cell_info['category'], significance, is_malignant
+
+
+CELL_NAMES = {code: info['name'] for code, info in CELL_INFO.items()}
+
+# Distribution table cells never change per cell type, so format them once
+PRECOMPUTED_CELL_ROWS = {code: _distribution_cells(code, info) for code, info in CELL_INFO.items()}
+
+# Diagnosis box settings per classification: (color, background, risk level, recommendation)
+DIAGNOSIS_META = {
+    "MALIGNANT": (
+        COLORS['danger'],
+        colors.HexColor('#FEE2E2'),
+        "HIGH RISK",
+        "Immediate hematological consultation recommended. Further molecular testing advised."
+    ),
+    "SUSPICIOUS": (
+        COLORS['warning'],
+        colors.HexColor('#FEF3C7'),
+        "MODERATE RISK",
+        "Follow-up evaluation recommended. Consider repeat analysis in 2-4 weeks."
+    ),
+    "BENIGN": (
+        COLORS['success'],
+        colors.HexColor('#DCFCE7'),
+        "LOW RISK",
+        "Findings within normal parameters. Routine follow-up as clinically indicated."
+    ),
+}
+
+# Clinical interpretation text per classification, filled in with str.format_map
+_INTERPRETATION_PREAMBLE = "Analysis of {total_cells} bone marrow cell(s) was performed using AI-assisted image classification. "
+INTERPRETATION_TEMPLATES = {
+    "MALIGNANT": _INTERPRETATION_PREAMBLE + (
+        "The analysis reveals a concerning pattern with {malignancy_pct:.1f}% of cells classified as potentially malignant. "
+        "The predominant cell type identified is {primary_name}, which {sig_lower}. "
+        "These findings warrant immediate clinical attention and further diagnostic workup. "
+    ),
+    "SUSPICIOUS": _INTERPRETATION_PREAMBLE + (
+        "The analysis shows borderline findings with {malignancy_pct:.1f}% potentially abnormal cells. "
+        "The predominant cell type is {primary_name}. "
+        "While not definitively malignant, these findings warrant close monitoring and follow-up evaluation. "
+    ),
+    "BENIGN": _INTERPRETATION_PREAMBLE + (
+        "The cellular composition appears within normal parameters with minimal abnormal cells ({malignancy_pct:.1f}%). "
+        "The predominant cell type is {primary_name}, which is {normal_sig}. "
+        "No immediate concerns identified based on AI analysis. "
+    ),
+}
+
+# Paragraph styles, built once at import
+_STYLES = getSampleStyleSheet()
+LOGO_STYLE = ParagraphStyle('Logo', parent=_STYLES['Heading1'], fontSize=28, textColor=COLORS['primary'], alignment=TA_CENTER, spaceAfter=5)
+TITLE_STYLE = ParagraphStyle('Title', parent=_STYLES['Heading1'], fontSize=16, textColor=COLORS['dark'], alignment=TA_CENTER, spaceAfter=5)
+SUBTITLE_STYLE = ParagraphStyle('Subtitle', parent=_STYLES['Normal'], fontSize=10, textColor=COLORS['gray'], alignment=TA_CENTER, spaceAfter=15)
+SECTION_STYLE = ParagraphStyle('Section', parent=_STYLES['Heading2'], fontSize=13, textColor=COLORS['primary'], spaceBefore=15, spaceAfter=8, borderPadding=(0, 0, 5, 0))
+SUBSECTION_STYLE = ParagraphStyle('Subsection', parent=_STYLES['Heading3'], fontSize=11, textColor=COLORS['dark'], spaceBefore=10, spaceAfter=6)
+NORMAL_STYLE = ParagraphStyle('CustomNormal', parent=_STYLES['Normal'], fontSize=10, textColor=COLORS['dark'], spaceAfter=4, leading=14)
+SMALL_STYLE = ParagraphStyle('Small', parent=_STYLES['Normal'], fontSize=9, textColor=COLORS['gray'], spaceAfter=3)
+DISCLAIMER_STYLE = ParagraphStyle('Disclaimer', parent=_STYLES['Normal'], fontSize=8, textColor=COLORS['gray'], alignment=TA_JUSTIFY, leading=11)
+RISK_STYLE = ParagraphStyle('Risk', parent=NORMAL_STYLE, alignment=TA_CENTER)
+DISCLAIMER_TITLE_STYLE = ParagraphStyle('DisclaimerTitle', parent=SMALL_STYLE, textColor=COLORS['dark'])
+FOOTER_STYLE = ParagraphStyle('Footer', parent=SMALL_STYLE, alignment=TA_CENTER)
+
+# Table styles that don't depend on the report content
+PATIENT_TABLE_STYLE = TableStyle((
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('TEXTCOLOR', (0, 0), (-1, -1), COLORS['dark']),
+    ('BACKGROUND', (0, 0), (-1, -1), COLORS['light_gray']),
+    ('GRID', (0, 0), (-1, -1), 0.5, COLORS['border']),
+    ('PADDING', (0, 0), (-1, -1), 8),
+))
+SUMMARY_TABLE_STYLE = TableStyle((
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('TEXTCOLOR', (0, 0), (-1, -1), COLORS['dark']),
+    ('BACKGROUND', (1, 0), (1, -1), COLORS['light_gray']),
+    ('BACKGROUND', (3, 0), (3, -1), COLORS['light_gray']),
+    ('GRID', (0, 0), (-1, -1), 0.5, COLORS['border']),
+    ('PADDING', (0, 0), (-1, -1), 8),
+    ('ALIGN', (1, 0), (1, -1), 'CENTER'),
+    ('ALIGN', (3, 0), (3, -1), 'CENTER'),
+))
+DIST_TABLE_STYLE = TableStyle((
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('BACKGROUND', (0, 0), (-1, 0), COLORS['primary']),
+    ('TEXTCOLOR', (0, 1), (-1, -1), COLORS['dark']),
+    ('GRID', (0, 0), (-1, -1), 0.5, COLORS['border']),
+    ('PADDING', (0, 0), (-1, -1), 5),
+    ('ALIGN', (1, 0), (2, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), (colors.white, COLORS['light_gray'])),
+))
+IND_TABLE_STYLE = TableStyle((
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('BACKGROUND', (0, 0), (-1, 0), COLORS['primary']),
+    ('GRID', (0, 0), (-1, -1), 0.5, COLORS['border']),
+    ('PADDING', (0, 0), (-1, -1), 5),
+    ('ALIGN', (0, 0), (3, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), (colors.white, COLORS['light_gray'])),
+))
+QUALITY_TABLE_STYLE = TableStyle((
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('GRID', (0, 0), (-1, -1), 0.5, COLORS['border']),
+    ('PADDING', (0, 0), (-1, -1), 6),
+    ('BACKGROUND', (0, 0), (-1, -1), COLORS['light_gray']),
+))
+
+# Long tables are split into chunks of this many rows so layout cost stays linear
+TABLE_BATCH_ROWS = 100
+
+
+def _emit_batched_table(elements: list, header: list, rows, col_widths: list, style: TableStyle, batch: int = TABLE_BATCH_ROWS):
+    """Append rows from any iterable as consecutive tables of at most `batch` rows, each with its own header"""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, batch))
+        if not chunk:
+            break
+        table = Table([header] + chunk, colWidths=col_widths, repeatRows=1)
+        table.setStyle(style)
+        elements.append(table)
+        elements.append(Spacer(1, 0.05*inch))
+
+
+@lru_cache(maxsize=1)
+def _fmt_date(bucket: int) -> str:
+    """Report timestamp, formatted once per second (`bucket` is the epoch second)"""
+    return datetime.fromtimestamp(bucket).strftime("%B %d, %Y at %I:%M %p")
+
+
+def _should_emit_individual(individual_results: list) -> bool:
+    """Whether the per-cell table adds anything beyond the cell distribution table"""
+    if not individual_results or len(individual_results) <= 1:
+        return False
+    first = individual_results[0]
+    first_key = (first.get('primary_class'), first.get('classification'))
+    # If every cell got the same result the distribution table already says it all
+    return any((r.get('primary_class'), r.get('classification')) != first_key for r in individual_results)
+
+
+def _individual_rows(individual_results: list):
+    """Yield the individual cell analysis table rows"""
+    for idx, result in enumerate(individual_results, 1):
+        primary = result.get('primary_class', 'N/A')
+        yield [
+            str(idx),
+            result.get('classification', 'N/A'),
+            _PCT(result.get('confidence', 0)),
+            "Yes !" if primary in MALIGNANT_CLASSES else "No",
+            _LABEL(CELL_NAMES.get(primary, primary), primary)
+        ]
+
+
+class _CachedParagraph(Paragraph):
+    """
+    Paragraph for constant markup that reuses the parsed fragment list
+    
+    Parsing is shared across reports; each instance still does its own layout,
+    since ReportLab needs a fresh flowable per document.
+    """
+    _frag_cache = {}
+    
+    def __init__(self, text, style, **kwargs):
+        if 'frags' in kwargs:
+            # Paragraph.split builds each half from explicit frags and no text
+            super().__init__(text, style, **kwargs)
+            return
+        key = (text, style.name, style.fontName, style.fontSize, style.textColor)
+        frags = self._frag_cache.get(key)
+        super().__init__(text, style, frags=frags, **kwargs)
+        if frags is None:
+            self._frag_cache[key] = self.frags
+
+
+# Static report content
+QUALITY_DATA = [
+    ["Image Quality", "Acceptable", "Model Version", "Cytomind v1.0"],
+    ["Processing Time", "< 5 seconds", "Confidence Threshold", ">= 5%"],
+]
+
+DISCLAIMER_TEXT = (
+    "This report has been generated by the Cytomind AI-assisted diagnostic system. The artificial intelligence "
+    "algorithms used in this analysis are designed to assist healthcare professionals in cell classification and "
+    "should not be used as the sole basis for clinical diagnosis or treatment decisions. All findings should be "
+    "validated by a qualified hematopathologist or clinical laboratory professional. The accuracy of AI predictions "
+    "may vary based on image quality and sample preparation. This report does not constitute medical advice."
+)
+
+
+# ReportLab flowables hold layout state and can't be shared between builds,
+# so these return fresh instances built from the shared styles and text
+def _static_header_flowables() -> list:
+    """Logo, title and rule at the top of every report"""
+    return [
+        _CachedParagraph("CYTOMIND", LOGO_STYLE),
+        _CachedParagraph("Bone Marrow Cell Analysis Report", TITLE_STYLE),
+        HRFlowable(width="100%", thickness=2, color=COLORS['primary'], spaceBefore=10, spaceAfter=10),
+    ]
+
+
+def _static_quality_flowables() -> list:
+    """Quality metrics table"""
+    quality_table = Table(QUALITY_DATA, colWidths=[1.5*inch, 2*inch, 1.5*inch, 2*inch])
+    quality_table.setStyle(QUALITY_TABLE_STYLE)
+    return [quality_table]
+
+
+def _static_disclaimer_flowables() -> list:
+    """Rule and disclaimer at the end of every report"""
+    return [
+        HRFlowable(width="100%", thickness=1, color=COLORS['border'], spaceBefore=10, spaceAfter=10),
+        _CachedParagraph("<b>DISCLAIMER</b>", DISCLAIMER_TITLE_STYLE),
+        _CachedParagraph(DISCLAIMER_TEXT, DISCLAIMER_STYLE),
+    ]
+
+
+def _generate_pdf_report_sync(
     job_id: str,
     patient_data: dict,
     classification_result: dict,
@@ -60,65 +302,35 @@ def generate_pdf_report(
     Generate a comprehensive medical PDF report for bone marrow cell classification
     """
     pdf_path = os.path.join(REPORTS_DIR, f"report_{job_id}.pdf")
-    doc = SimpleDocTemplate(
-        pdf_path, 
-        pagesize=letter, 
-        topMargin=0.5*inch, 
-        bottomMargin=0.75*inch,
-        leftMargin=0.75*inch,
-        rightMargin=0.75*inch
-    )
-    
-    styles = getSampleStyleSheet()
     elements = []
     
-    # ===== STYLES =====
-    logo_style = ParagraphStyle('Logo', parent=styles['Heading1'], fontSize=28, textColor=COLORS['primary'], alignment=TA_CENTER, spaceAfter=5)
-    title_style = ParagraphStyle('Title', parent=styles['Heading1'], fontSize=16, textColor=COLORS['dark'], alignment=TA_CENTER, spaceAfter=5)
-    subtitle_style = ParagraphStyle('Subtitle', parent=styles['Normal'], fontSize=10, textColor=COLORS['gray'], alignment=TA_CENTER, spaceAfter=15)
-    section_style = ParagraphStyle('Section', parent=styles['Heading2'], fontSize=13, textColor=COLORS['primary'], spaceBefore=15, spaceAfter=8, borderPadding=(0, 0, 5, 0))
-    subsection_style = ParagraphStyle('Subsection', parent=styles['Heading3'], fontSize=11, textColor=COLORS['dark'], spaceBefore=10, spaceAfter=6)
-    normal_style = ParagraphStyle('CustomNormal', parent=styles['Normal'], fontSize=10, textColor=COLORS['dark'], spaceAfter=4, leading=14)
-    small_style = ParagraphStyle('Small', parent=styles['Normal'], fontSize=9, textColor=COLORS['gray'], spaceAfter=3)
-    disclaimer_style = ParagraphStyle('Disclaimer', parent=styles['Normal'], fontSize=8, textColor=COLORS['gray'], alignment=TA_JUSTIFY, leading=11)
-    
     # ===== HEADER =====
-    elements.append(Paragraph("CYTOMIND", logo_style))
-    elements.append(Paragraph("Bone Marrow Cell Analysis Report", title_style))
-    elements.append(HRFlowable(width="100%", thickness=2, color=COLORS['primary'], spaceBefore=10, spaceAfter=10))
+    elements.extend(_static_header_flowables())
     
     # Report metadata
-    report_date = datetime.now().strftime("%B %d, %Y at %I:%M %p")
+    report_date = _fmt_date(int(time.time()))
     meta_data = [
-        [Paragraph(f"<b>Report Date:</b> {report_date}", small_style),
-         Paragraph(f"<b>Report ID:</b> {job_id[:8]}...", small_style)]
+        [Paragraph(f"<b>Report Date:</b> {report_date}", SMALL_STYLE),
+         Paragraph(f"<b>Report ID:</b> {job_id[:8]}...", SMALL_STYLE)]
     ]
     meta_table = Table(meta_data, colWidths=[3.5*inch, 3.5*inch])
     elements.append(meta_table)
     elements.append(Spacer(1, 15))
     
     # ===== PATIENT INFORMATION =====
-    elements.append(Paragraph("PATIENT INFORMATION", section_style))
+    elements.append(_CachedParagraph("PATIENT INFORMATION", SECTION_STYLE))
     
     patient_table_data = [
         ["Patient ID", patient_data.get("patientId", "N/A"), "Age", f"{patient_data.get('age', 'N/A')} years"],
         ["Patient Name", patient_data.get("name", "N/A"), "Gender", "Not specified"],
     ]
     patient_table = Table(patient_table_data, colWidths=[1.2*inch, 2.3*inch, 1*inch, 2.5*inch])
-    patient_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TEXTCOLOR', (0, 0), (-1, -1), COLORS['dark']),
-        ('BACKGROUND', (0, 0), (-1, -1), COLORS['light_gray']),
-        ('GRID', (0, 0), (-1, -1), 0.5, COLORS['border']),
-        ('PADDING', (0, 0), (-1, -1), 8),
-    ]))
+    patient_table.setStyle(PATIENT_TABLE_STYLE)
     elements.append(patient_table)
     elements.append(Spacer(1, 15))
     
     # ===== SUMMARY DIAGNOSIS =====
-    elements.append(Paragraph("SUMMARY DIAGNOSIS", section_style))
+    elements.append(_CachedParagraph("SUMMARY DIAGNOSIS", SECTION_STYLE))
     
     classification = classification_result.get("classification", "N/A")
     total_cells = classification_result.get("total_cells", len(individual_results) if individual_results else 1)
@@ -126,68 +338,43 @@ def generate_pdf_report(
     malignant_count = classification_result.get("malignant_cell_count", 0)
     
     # Diagnosis box with color coding
-    if classification == "MALIGNANT":
-        diag_color = COLORS['danger']
-        diag_bg = colors.HexColor('#FEE2E2')
-        risk_level = "HIGH RISK"
-        recommendation = "Immediate hematological consultation recommended. Further molecular testing advised."
-    elif classification == "SUSPICIOUS":
-        diag_color = COLORS['warning']
-        diag_bg = colors.HexColor('#FEF3C7')
-        risk_level = "MODERATE RISK"
-        recommendation = "Follow-up evaluation recommended. Consider repeat analysis in 2-4 weeks."
-    else:
-        diag_color = COLORS['success']
-        diag_bg = colors.HexColor('#DCFCE7')
-        risk_level = "LOW RISK"
-        recommendation = "Findings within normal parameters. Routine follow-up as clinically indicated."
-    
-    diag_style = ParagraphStyle('Diagnosis', parent=styles['Heading1'], fontSize=16, textColor=diag_color, alignment=TA_CENTER)
+    diag_color, diag_bg, risk_level, recommendation = DIAGNOSIS_META.get(classification, DIAGNOSIS_META["BENIGN"])
+    
+    diag_style = ParagraphStyle('Diagnosis', parent=_STYLES['Heading1'], fontSize=16, textColor=diag_color, alignment=TA_CENTER)
     
     diagnosis_data = [
         [Paragraph(f"<b>OVERALL ASSESSMENT: {classification}</b>", diag_style)],
-        [Paragraph(f"<b>Risk Level:</b> {risk_level}", ParagraphStyle('Risk', parent=normal_style, alignment=TA_CENTER))],
+        [Paragraph(f"<b>Risk Level:</b> {risk_level}", RISK_STYLE)],
     ]
     diagnosis_table = Table(diagnosis_data, colWidths=[7*inch])
-    diagnosis_table.setStyle(TableStyle([
+    diagnosis_table.setStyle(TableStyle((
         ('BACKGROUND', (0, 0), (-1, -1), diag_bg),
         ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
         ('PADDING', (0, 0), (-1, -1), 12),
         ('BOX', (0, 0), (-1, -1), 2, diag_color),
-    ]))
+    )))
     elements.append(diagnosis_table)
     elements.append(Spacer(1, 15))
     
     # ===== ANALYSIS SUMMARY =====
-    elements.append(Paragraph("ANALYSIS SUMMARY", section_style))
+    elements.append(_CachedParagraph("ANALYSIS SUMMARY", SECTION_STYLE))
     
     primary_class = classification_result.get("primary_class", "N/A")
     primary_name = CELL_INFO.get(primary_class, {}).get('name', primary_class)
     confidence = classification_result.get("confidence", 0)
     
     summary_data = [
-        ["Total Cells Analyzed", str(total_cells), "Primary Cell Type", f"{primary_name} ({primary_class})"],
-        ["Malignant Cells Detected", str(malignant_count), "Malignancy Rate", f"{malignancy_pct:.1f}%"],
-        ["Average Confidence", f"{confidence:.1f}%", "Analysis Method", "AI Ensemble (ViT + ResNet)"],
+        ["Total Cells Analyzed", str(total_cells), "Primary Cell Type", _LABEL(primary_name, primary_class)],
+        ["Malignant Cells Detected", str(malignant_count), "Malignancy Rate", _PCT(malignancy_pct)],
+        ["Average Confidence", _PCT(confidence), "Analysis Method", "AI Ensemble (ViT + ResNet)"],
     ]
     summary_table = Table(summary_data, colWidths=[1.5*inch, 1.7*inch, 1.5*inch, 2.3*inch])
-    summary_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('TEXTCOLOR', (0, 0), (-1, -1), COLORS['dark']),
-        ('BACKGROUND', (1, 0), (1, -1), COLORS['light_gray']),
-        ('BACKGROUND', (3, 0), (3, -1), COLORS['light_gray']),
-        ('GRID', (0, 0), (-1, -1), 0.5, COLORS['border']),
-        ('PADDING', (0, 0), (-1, -1), 8),
-        ('ALIGN', (1, 0), (1, -1), 'CENTER'),
-        ('ALIGN', (3, 0), (3, -1), 'CENTER'),
-    ]))
+    summary_table.setStyle(SUMMARY_TABLE_STYLE)
     elements.append(summary_table)
     elements.append(Spacer(1, 15))
     
     # ===== CELL DISTRIBUTION =====
-    elements.append(Paragraph("CELL TYPE DISTRIBUTION", section_style))
+    elements.append(_CachedParagraph("CELL TYPE DISTRIBUTION", SECTION_STYLE))
     
     cell_distribution = classification_result.get("cell_distribution", {})
     
@@ -195,144 +382,156 @@ def generate_pdf_report(
         dist_header = ["Cell Type", "Count", "Percentage", "Category", "Clinical Significance"]
         dist_data = [dist_header]
         
-        for cell_code, data in cell_distribution.items():
-            if isinstance(data, dict):
-                count = data.get('count', 0)
-                pct = data.get('percentage', 0)
-            else:
-                count = data
-                pct = (count / total_cells * 100) if total_cells > 0 else 0
-            
-            cell_info = CELL_INFO.get(cell_code, {'name': cell_code, 'category': 'Unknown', 'significance': 'N/A'})
-            is_malignant = cell_code in MALIGNANT_CLASSES
+        values = list(cell_distribution.values())
+        if all(isinstance(v, dict) for v in values):
+            counts = [v.get('count', 0) for v in values]
+            pcts = [v.get('percentage', 0) for v in values]
+        else:
+            # Raw counts: compute all percentages in one vectorized pass
+            counts = np.fromiter((v.get('count', 0) if isinstance(v, dict) else v for v in values), dtype=np.int64, count=len(values))
+            pcts = counts * (100.0 / total_cells) if total_cells > 0 else np.zeros(len(values))
+        
+        for cell_code, count, pct in zip(cell_distribution, counts, pcts):
+            label, category, significance, _ = PRECOMPUTED_CELL_ROWS.get(cell_code) or _distribution_cells(
+                cell_code, {'name': cell_code, 'category': 'Unknown', 'significance': 'N/A'}
+            )
             
-            dist_data.append([
-                f"{cell_info['name']} ({cell_code})" + (" !" if is_malignant else ""),
-                str(count),
-                f"{pct:.1f}%",
-                cell_info['category'],
-                cell_info['significance'][:50] + "..." if len(cell_info['significance']) > 50 else cell_info['significance']
-            ])
+            dist_data.append([label, str(count), _PCT(pct), category, significance])
         
         dist_table = Table(dist_data, colWidths=[1.8*inch, 0.6*inch, 0.8*inch, 1.3*inch, 2.5*inch])
-        dist_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('BACKGROUND', (0, 0), (-1, 0), COLORS['primary']),
-            ('TEXTCOLOR', (0, 1), (-1, -1), COLORS['dark']),
-            ('GRID', (0, 0), (-1, -1), 0.5, COLORS['border']),
-            ('PADDING', (0, 0), (-1, -1), 5),
-            ('ALIGN', (1, 0), (2, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, COLORS['light_gray']]),
-        ]))
+        dist_table.setStyle(DIST_TABLE_STYLE)
         elements.append(dist_table)
     elements.append(Spacer(1, 15))
     
-    # ===== INDIVIDUAL CELL ANALYSIS (if multiple images) =====
-    if individual_results and len(individual_results) > 1:
-        elements.append(Paragraph("INDIVIDUAL CELL ANALYSIS", section_style))
+    # ===== INDIVIDUAL CELL ANALYSIS (if multiple, differing images) =====
+    if _should_emit_individual(individual_results):
+        elements.append(_CachedParagraph("INDIVIDUAL CELL ANALYSIS", SECTION_STYLE))
         
         ind_header = ["#", "Classification", "Confidence", "Malignant", "Top Prediction"]
-        ind_data = [ind_header]
-        
-        for idx, result in enumerate(individual_results[:20], 1):  # Limit to 20 rows
-            primary = result.get('primary_class', 'N/A')
-            conf = result.get('confidence', 0)
-            is_mal = "Yes !" if primary in MALIGNANT_CLASSES else "No"
-            cell_name = CELL_INFO.get(primary, {}).get('name', primary)
-            
-            ind_data.append([
-                str(idx),
-                result.get('classification', 'N/A'),
-                f"{conf:.1f}%",
-                is_mal,
-                f"{cell_name} ({primary})"
-            ])
-        
-        if len(individual_results) > 20:
-            ind_data.append(["...", f"+ {len(individual_results) - 20} more cells", "", "", ""])
         
-        ind_table = Table(ind_data, colWidths=[0.4*inch, 1.2*inch, 1*inch, 1*inch, 3.4*inch])
-        ind_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('BACKGROUND', (0, 0), (-1, 0), COLORS['primary']),
-            ('GRID', (0, 0), (-1, -1), 0.5, COLORS['border']),
-            ('PADDING', (0, 0), (-1, -1), 5),
-            ('ALIGN', (0, 0), (3, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, COLORS['light_gray']]),
-        ]))
-        elements.append(ind_table)
+        _emit_batched_table(elements, ind_header, _individual_rows(individual_results), [0.4*inch, 1.2*inch, 1*inch, 1*inch, 3.4*inch], IND_TABLE_STYLE)
         elements.append(Spacer(1, 15))
     
     # ===== CLINICAL INTERPRETATION =====
-    elements.append(Paragraph("CLINICAL INTERPRETATION", section_style))
+    elements.append(_CachedParagraph("CLINICAL INTERPRETATION", SECTION_STYLE))
     
     interpretation = generate_clinical_interpretation(classification_result, individual_results)
-    elements.append(Paragraph(interpretation, normal_style))
+    elements.append(Paragraph(interpretation, NORMAL_STYLE))
     elements.append(Spacer(1, 10))
     
     # Recommendations
-    elements.append(Paragraph("<b>Recommendations:</b>", normal_style))
-    elements.append(Paragraph(f"- {recommendation}", normal_style))
+    elements.append(_CachedParagraph("<b>Recommendations:</b>", NORMAL_STYLE))
+    elements.append(Paragraph(f"- {recommendation}", NORMAL_STYLE))
     
     if classification == "MALIGNANT":
-        elements.append(Paragraph("- Flow cytometry and cytogenetic analysis recommended", normal_style))
-        elements.append(Paragraph("- Molecular testing for specific mutations (FLT3, NPM1, CEBPA)", normal_style))
-        elements.append(Paragraph("- Consider bone marrow biopsy for tissue architecture evaluation", normal_style))
+        elements.append(_CachedParagraph("- Flow cytometry and cytogenetic analysis recommended", NORMAL_STYLE))
+        elements.append(_CachedParagraph("- Molecular testing for specific mutations (FLT3, NPM1, CEBPA)", NORMAL_STYLE))
+        elements.append(_CachedParagraph("- Consider bone marrow biopsy for tissue architecture evaluation", NORMAL_STYLE))
     elif classification == "SUSPICIOUS":
-        elements.append(Paragraph("- Repeat peripheral blood smear review", normal_style))
-        elements.append(Paragraph("- Monitor complete blood count trends", normal_style))
+        elements.append(_CachedParagraph("- Repeat peripheral blood smear review", NORMAL_STYLE))
+        elements.append(_CachedParagraph("- Monitor complete blood count trends", NORMAL_STYLE))
     
     elements.append(Spacer(1, 20))
     
     # ===== QUALITY METRICS =====
-    elements.append(Paragraph("QUALITY METRICS", section_style))
+    elements.append(_CachedParagraph("QUALITY METRICS", SECTION_STYLE))
     
-    quality_data = [
-        ["Image Quality", "Acceptable", "Model Version", "Cytomind v1.0"],
-        ["Processing Time", "< 5 seconds", "Confidence Threshold", ">= 5%"],
-    ]
-    quality_table = Table(quality_data, colWidths=[1.5*inch, 2*inch, 1.5*inch, 2*inch])
-    quality_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('GRID', (0, 0), (-1, -1), 0.5, COLORS['border']),
-        ('PADDING', (0, 0), (-1, -1), 6),
-        ('BACKGROUND', (0, 0), (-1, -1), COLORS['light_gray']),
-    ]))
-    elements.append(quality_table)
+    elements.extend(_static_quality_flowables())
     elements.append(Spacer(1, 25))
     
     # ===== FOOTER / DISCLAIMER =====
-    elements.append(HRFlowable(width="100%", thickness=1, color=COLORS['border'], spaceBefore=10, spaceAfter=10))
-    
-    elements.append(Paragraph("<b>DISCLAIMER</b>", ParagraphStyle('DisclaimerTitle', parent=small_style, textColor=COLORS['dark'])))
-    elements.append(Paragraph(
-        "This report has been generated by the Cytomind AI-assisted diagnostic system. The artificial intelligence "
-        "algorithms used in this analysis are designed to assist healthcare professionals in cell classification and "
-        "should not be used as the sole basis for clinical diagnosis or treatment decisions. All findings should be "
-        "validated by a qualified hematopathologist or clinical laboratory professional. The accuracy of AI predictions "
-        "may vary based on image quality and sample preparation. This report does not constitute medical advice.",
-        disclaimer_style
-    ))
+    elements.extend(_static_disclaimer_flowables())
     
     elements.append(Spacer(1, 10))
     elements.append(Paragraph(
         f"Cytomind | AI-Powered Bone Marrow Analysis | Report generated on {report_date}",
-        ParagraphStyle('Footer', parent=small_style, alignment=TA_CENTER)
+        FOOTER_STYLE
     ))
     
-    # Build PDF
-    doc.build(elements)
+    # Build PDF into a buffered temp file, renamed into place only once complete
+    tmp_path = pdf_path + ".tmp"
+    try:
+        with open(tmp_path, 'wb', buffering=1024 * 1024) as fh:
+            doc = SimpleDocTemplate(
+                fh,
+                pagesize=letter,
+                topMargin=0.5*inch,
+                bottomMargin=0.75*inch,
+                leftMargin=0.75*inch,
+                rightMargin=0.75*inch,
+                pageCompression=1
+            )
+            doc.build(elements)
+        os.replace(tmp_path, pdf_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
     return pdf_path
 
 
+# Report worker pool, created on first use
+report_pool = None
+
+def get_report_pool() -> ProcessPoolExecutor:
+    """Get or create the process pool used for PDF generation"""
+    global report_pool
+    if report_pool is None:
+        # spawn avoids forking the parent's CUDA context and threads
+        report_pool = ProcessPoolExecutor(
+            max_workers=REPORT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return report_pool
+
+
+def generate_pdf_report_async(
+    job_id: str,
+    patient_data: dict,
+    classification_result: dict,
+    image_paths: list = None,
+    individual_results: list = None
+) -> Future:
+    """
+    Generate a PDF report in a worker process
+    
+    Returns:
+        Future resolving to the PDF path
+    """
+    return get_report_pool().submit(
+        _generate_pdf_report_sync,
+        job_id,
+        patient_data,
+        classification_result,
+        image_paths,
+        individual_results
+    )
+
+
+def _generate_pdf_report_job(job: dict) -> str:
+    """Pool entry point taking the report arguments as one dict"""
+    return _generate_pdf_report_sync(**job)
+
+
+def generate_pdf_report_bulk(jobs: list) -> list:
+    """
+    Generate PDF reports for many jobs across the report worker pool
+    
+    Each worker process builds the module-level styles once and reuses them
+    for every report it renders. Jobs are sent to workers in chunks to
+    amortize inter-process overhead.
+    
+    Args:
+        jobs: List of dicts with the generate_pdf_report_async arguments
+            (job_id, patient_data, classification_result, ...)
+            
+    Returns:
+        List of PDF paths, in the same order as jobs
+    """
+    chunksize = max(1, len(jobs) // (REPORT_WORKERS * 4))
+    return list(get_report_pool().map(_generate_pdf_report_job, jobs, chunksize=chunksize))
+
+
 def generate_clinical_interpretation(classification_result: dict, individual_results: list = None) -> str:
     """Generate clinical interpretation text based on analysis results"""
     classification = classification_result.get("classification", "N/A")
@@ -342,28 +541,23 @@ def generate_clinical_interpretation(classification_result: dict, individual_res
     cell_distribution = classification_result.get("cell_distribution", {})
     
     primary_info = CELL_INFO.get(primary_class, {'name': primary_class, 'significance': ''})
-    
-    interpretation = f"Analysis of {total_cells} bone marrow cell(s) was performed using AI-assisted image classification. "
-    
+    sig_lower = primary_info['significance'].lower()
+    
+    fields = {
+        "total_cells": total_cells,
+        "malignancy_pct": malignancy_pct,
+        "primary_name": primary_info['name'],
+        "sig_lower": sig_lower,
+        "normal_sig": sig_lower or 'a normal finding',
+    }
+    template = INTERPRETATION_TEMPLATES.get(classification, INTERPRETATION_TEMPLATES["BENIGN"])
+    interpretation = template.format_map(fields)
+    
+    # Check for specific malignant patterns
     if classification == "MALIGNANT":
-        interpretation += f"The analysis reveals a concerning pattern with {malignancy_pct:.1f}% of cells classified as potentially malignant. "
-        interpretation += f"The predominant cell type identified is {primary_info['name']}, which {primary_info['significance'].lower()}. "
-        interpretation += "These findings warrant immediate clinical attention and further diagnostic workup. "
-        
-        # Check for specific malignant patterns
         if 'FGC' in cell_distribution:
             interpretation += "CRITICAL: Faggot cells detected, which are pathognomonic for Acute Promyelocytic Leukemia (APL). Urgent evaluation required. "
         if 'BLA' in cell_distribution or 'MYB' in cell_distribution:
             interpretation += "Elevated blast/myeloblast population detected, concerning for acute leukemia. "
-            
-    elif classification == "SUSPICIOUS":
-        interpretation += f"The analysis shows borderline findings with {malignancy_pct:.1f}% potentially abnormal cells. "
-        interpretation += f"The predominant cell type is {primary_info['name']}. "
-        interpretation += "While not definitively malignant, these findings warrant close monitoring and follow-up evaluation. "
-        
-    else:
-        interpretation += f"The cellular composition appears within normal parameters with minimal abnormal cells ({malignancy_pct:.1f}%). "
-        interpretation += f"The predominant cell type is {primary_info['name']}, which is {primary_info['significance'].lower() if primary_info['significance'] else 'a normal finding'}. "
-        interpretation += "No immediate concerns identified based on AI analysis. "
     
     return interpretation
@@ -23,4 +23,4 @@ REM Start the server
 echo Starting FastAPI server on http://127.0.0.1:8000
 echo Press Ctrl+C to stop
 echo.
-python main.py
+python -m uvicorn main:app --host 127.0.0.1 --port 8000
@@ -0,0 +1,47 @@
+import os
+import report_generator
+from report_generator import _CachedParagraph, _generate_pdf_report_sync, DISCLAIMER_TEXT, DISCLAIMER_STYLE
+
+
+def _report_inputs(total_cells: int):
+    """Classification result and alternating BLA/NGS individual results for a report"""
+    individual_results = [
+        {'primary_class': 'BLA', 'classification': 'MALIGNANT', 'confidence': 90.0} if i % 2 == 0
+        else {'primary_class': 'NGS', 'classification': 'BENIGN', 'confidence': 90.0}
+        for i in range(total_cells)
+    ]
+    blasts = (total_cells + 1) // 2
+    classification_result = {
+        "classification": "MALIGNANT",
+        "primary_class": "BLA",
+        "confidence": 90.0,
+        "malignancy_percentage": blasts / total_cells * 100,
+        "malignant_cell_count": blasts,
+        "total_cells": total_cells,
+        "cell_distribution": {"BLA": blasts, "NGS": total_cells - blasts},
+    }
+    return classification_result, individual_results
+
+
+def test_cached_paragraph_splits():
+    """A cached paragraph can be split across frames like a plain Paragraph"""
+    paragraph = _CachedParagraph(DISCLAIMER_TEXT, DISCLAIMER_STYLE)
+    paragraph.wrap(400, 1000)
+    parts = paragraph.split(400, 30)
+    assert len(parts) == 2
+
+
+def test_report_builds_across_page_breaks(tmp_path, monkeypatch):
+    """Reports build whatever falls on a page boundary, including split static paragraphs"""
+    monkeypatch.setattr(report_generator, "REPORTS_DIR", str(tmp_path))
+    # Each extra row moves the later sections down, so this range puts the
+    # disclaimer and the section headings across a page break several times
+    for total_cells in range(2, 130):
+        classification_result, individual_results = _report_inputs(total_cells)
+        pdf_path = _generate_pdf_report_sync(
+            f"job{total_cells:04d}",
+            {"patientId": "P-1", "name": "Test Patient", "age": 40},
+            classification_result,
+            individual_results=individual_results
+        )
+        assert os.path.getsize(pdf_path) > 0
@@ -78,12 +78,25 @@ export const api = {
     const token = localStorage.getItem('token');
     
     try {
-      const response = await fetch(`/api/reports/${jobId}`, {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
+      let response;
+      for (let attempt = 0; attempt < 10; attempt++) {
+        response = await fetch(`/api/reports/${jobId}`, {
+          headers: { 'Authorization': `Bearer ${token}` }
+        });
+
+        // 202 means the PDF is still being generated, wait and retry
+        if (response.status !== 202) break;
+        const retryAfter = Number(response.headers.get('Retry-After')) || 2;
+        await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000));
+      }
+      
+      if (response.status === 202) {
+        throw new Error('Report PDF is still being generated, please try again shortly');
+      }
       
       if (!response.ok) {
-        throw new Error('Download failed');
+        const data = await response.json().catch(() => ({}));
+        throw new Error(data.message || 'Download failed');
       }
       
       const blob = await response.blob();